@@ -1,2 +1,4 @@
 # load the modules in the package
-from .analysis import *
\ No newline at end of file
+from .analysis import *
+from .moments import *
+from .qc import *
\ No newline at end of file
@@ -0,0 +1,199 @@
+# streaming covariance and correlation of well logs,
+# computed per group (e.g., well, group or lithology)
+
+import numpy as np
+import pandas as pd
+
+class Moments:
+    """
+    Mergeable accumulator of the count, mean and co-moment
+    matrix of a set of logs. NaNs are handled pairwise: the
+    statistics of each pair of logs only use the samples
+    where both logs have values, as in df.cov() and df.corr()
+    """
+    def __init__(self, cols):
+        """
+        Initialize an empty accumulator
+        Input:
+            cols: list with the names of the logs
+        """
+        self.cols = list(cols)
+        k = len(self.cols)
+        # n[i,j]: number of samples where logs i and j exist
+        self.n = np.zeros((k, k))
+        # mean[i,j]: mean of log i where logs i and j exist
+        self.mean = np.zeros((k, k))
+        # co-moment: sum of (x_i - mean[i,j])(x_j - mean[j,i])
+        self.comoment = np.zeros((k, k))
+        # m2[i,j]: sum of (x_i - mean[i,j])**2
+        self.m2 = np.zeros((k, k))
+
+    def update(self, x):
+        """
+        Add a block of samples to the accumulator
+        Input:
+            x: 2D array (samples x logs) with NaNs where
+            a log has no value
+        """
+        x = np.asarray(x, dtype=float)
+        if x.shape[0] == 0:
+            return
+        # shift the block by its column means so the
+        # sums below do not lose precision
+        valid = ~np.isnan(x)
+        count = valid.sum(axis=0)
+        shift = np.zeros(x.shape[1])
+        shift[count > 0] = (np.nansum(x, axis=0)[count > 0]
+                            / count[count > 0])
+        # shifted values with zeros where there is no value
+        x0 = np.where(valid, x - shift, 0.0)
+        w = valid.astype(float)
+
+        # pairwise counts, sums and sums of products
+        n = w.T @ w
+        s = x0.T @ w
+        p = x0.T @ x0
+        q = (x0**2).T @ w
+
+        # pairwise means and centered moments of the block
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, s / n, 0.0)
+        comoment = p - n * mean * mean.T
+        m2 = q - n * mean**2
+
+        # merge the block into the accumulator
+        block = Moments(self.cols)
+        block.n, block.mean = n, mean + shift[:, None]
+        block.comoment, block.m2 = comoment, m2
+        self.merge(block)
+
+    def merge(self, other):
+        """
+        Merge another accumulator of the same logs into
+        this one (pairwise version of Chan et al. update)
+        Input:
+            other: Moments object
+        Output:
+            returns this object
+        """
+        if other.cols != self.cols:
+            raise ValueError("Moments must have the same logs")
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # weights of the other accumulator and of the
+            # cross term, zero where there are no samples
+            f = np.where(n > 0, other.n / n, 0.0)
+            g = np.where(n > 0, self.n * other.n / n, 0.0)
+        self.mean = self.mean + delta * f
+        self.comoment = (self.comoment + other.comoment
+                         + delta * delta.T * g)
+        self.m2 = self.m2 + other.m2 + delta**2 * g
+        self.n = n
+
+        return self
+
+    def cov(self, ddof=1):
+        """
+        Covariance matrix of the logs
+        Input:
+            ddof: delta degrees of freedom
+        Output:
+            DataFrame with the covariance matrix, NaN where
+            a pair of logs has not enough samples
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = np.where(self.n > ddof,
+                           self.comoment / (self.n - ddof), np.nan)
+
+        return pd.DataFrame(cov, index=self.cols, columns=self.cols)
+
+    def corr(self):
+        """
+        Pearson correlation matrix of the logs
+        Output:
+            DataFrame with the correlation matrix, NaN where
+            a pair of logs has not enough samples
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr[(self.n < 2) | ~np.isfinite(corr)] = np.nan
+        # round off errors may give values slightly beyond 1
+        corr = np.clip(corr, -1, 1)
+
+        return pd.DataFrame(corr, index=self.cols, columns=self.cols)
+
+def group_moments(chunks, cols, group_col=None):
+    """
+    Makes one pass over chunks of well log data and
+    accumulates the moments of the logs cols for each
+    class in group_col
+
+    Input:
+    chunks: DataFrame or iterable of DataFrames with the
+        well logs, e.g., pd.read_csv(path, chunksize=100000)
+    cols: list with the names of the logs
+    group_col: string with the name of the column with the
+        classes (e.g., "WELL", "GROUP" or "LITH"), or a list
+        of such names. None accumulates all the data together
+
+    Output:
+    moments: dictionary with the classes as the keys and
+        Moments objects as the values. Without group_col
+        the only key is "ALL"
+    """
+    # a single DataFrame is a single chunk
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    # group columns to process
+    if group_col is None:
+        groups = []
+    elif isinstance(group_col, str):
+        groups = [group_col]
+    else:
+        groups = list(group_col)
+
+    moments = {}
+    for chunk in chunks:
+        # all data together
+        if len(groups) == 0:
+            key = "ALL"
+            if key not in moments:
+                moments[key] = Moments(cols)
+            moments[key].update(chunk[cols].to_numpy(dtype=float))
+            continue
+        # data of each class in the chunk
+        for key, df in chunk.groupby(group_col, sort=False):
+            if key not in moments:
+                moments[key] = Moments(cols)
+            moments[key].update(df[cols].to_numpy(dtype=float))
+
+    return moments
+
+def group_cov_corr(chunks, cols, group_col=None, ddof=1):
+    """
+    Covariance and correlation matrices of the logs cols
+    for each class in group_col, computed in one pass over
+    chunks of well log data. NaNs are handled pairwise, so
+    no samples are dropped because another log is missing
+
+    Input:
+    chunks: DataFrame or iterable of DataFrames with the
+        well logs, e.g., pd.read_csv(path, chunksize=100000)
+    cols: list with the names of the logs
+    group_col: string with the name of the column with the
+        classes (e.g., "WELL", "GROUP" or "LITH"). None
+        computes the matrices of all the data
+    ddof: delta degrees of freedom of the covariance
+
+    Output:
+    covs: dictionary with the classes as the keys and
+        the covariance matrices (DataFrames) as the values
+    corrs: dictionary with the classes as the keys and
+        the correlation matrices (DataFrames) as the values
+    """
+    moments = group_moments(chunks, cols, group_col)
+    covs = {key: m.cov(ddof) for key, m in moments.items()}
+    corrs = {key: m.corr() for key, m in moments.items()}
+
+    return covs, corrs
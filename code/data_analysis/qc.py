@@ -0,0 +1,209 @@
+# quality control of well log data with rules that
+# are evaluated in one pass into per sample bit flags
+
+import numpy as np
+import pandas as pd
+
+# bit flags of the rules
+RANGE = 1 # value outside the valid range
+SPIKE = 2 # value far from the median with its neighbors
+WASHOUT = 4 # borehole enlarged (caliper - bit size)
+MISSING = 8 # no value or null value
+QC_BITS = {"range": RANGE, "spike": SPIKE,
+           "washout": WASHOUT, "missing": MISSING}
+ALL_BITS = RANGE | SPIKE | WASHOUT | MISSING
+
+def qc_flags(df, rules, well_col="WELL"):
+    """
+    Evaluates QC rules on the curves of a DataFrame with
+    well logs and returns the result as bit flags
+
+    Input:
+    df: DataFrame with the well logs, sorted by depth
+        within each well
+    rules: dictionary with the curve names as the keys and
+        dictionaries with the rules as the values. Rules are:
+        "range": (min, max) valid values
+        "spike": max difference between a value and the
+            median of the value and the values above and below.
+            At the ends of a well or next to a NaN, the two
+            values below or above are used instead, if they
+            exist
+        "washout": (caliper, bit size, max) where caliper is
+            a column name and bit size a column name or a
+            number. Flags samples where caliper - bit size
+            is larger than max
+        "missing": True to flag NaNs, or a null value
+            (e.g., -999.25) to flag NaNs and null values.
+            False turns the rule off
+        e.g., {"GR": {"range": (0, 300), "missing": True},
+               "RHOB": {"washout": ("CALI", "BS", 1.0)}}
+    well_col: string with the name of the column with the
+        wells. Spikes are not searched across wells
+
+    Output:
+    flags: DataFrame with the same index as df, a column
+        per curve in rules, and the bits RANGE, SPIKE,
+        WASHOUT and MISSING set where the rules fail
+    """
+    n = len(df)
+    # samples where the next sample is in the same well
+    if well_col in df.columns:
+        codes, _ = pd.factorize(df[well_col])
+        same = codes[1:] == codes[:-1]
+    else:
+        same = np.ones(max(n - 1, 0), dtype=bool)
+
+    flags = {}
+    for curve, curve_rules in rules.items():
+        for rule in curve_rules:
+            if rule not in QC_BITS:
+                raise ValueError(f"rule must be one of {list(QC_BITS)}")
+        x = df[curve].to_numpy(dtype=float)
+        flag = np.zeros(n, dtype=np.uint8)
+
+        # missing values, including null values
+        null = curve_rules.get("missing", False)
+        if null is not False:
+            missing = np.isnan(x)
+            if null is not True:
+                missing |= x == null
+                x = np.where(x == null, np.nan, x)
+            flag[missing] |= MISSING
+
+        # values outside the valid range
+        if "range" in curve_rules:
+            v_min, v_max = curve_rules["range"]
+            flag[(x < v_min) | (x > v_max)] |= RANGE
+
+        # values far from the median with their neighbors
+        if "spike" in curve_rules and n > 2:
+            # values one and two samples above and below,
+            # NaN where they are in another well
+            same_2 = same[:-1] & same[1:]
+            above, below = np.full(n, np.nan), np.full(n, np.nan)
+            above[1:] = np.where(same, x[:-1], np.nan)
+            below[:-1] = np.where(same, x[1:], np.nan)
+            above_2, below_2 = np.full(n, np.nan), np.full(n, np.nan)
+            above_2[2:] = np.where(same_2, x[:-2], np.nan)
+            below_2[:-2] = np.where(same_2, x[2:], np.nan)
+            # centered median, or one sided median at the
+            # ends of a well or next to a NaN
+            median = np.median(np.stack([above, x, below]), axis=0)
+            for side in [[x, below, below_2], [above_2, above, x]]:
+                one_sided = np.median(np.stack(side), axis=0)
+                median = np.where(np.isnan(median), one_sided, median)
+            spike = np.abs(x - median) > curve_rules["spike"]
+            flag[spike] |= SPIKE
+
+        # enlarged borehole
+        if "washout" in curve_rules:
+            cal, bit, v_max = curve_rules["washout"]
+            if isinstance(bit, str):
+                bit = df[bit].to_numpy(dtype=float)
+            washout = df[cal].to_numpy(dtype=float) - bit > v_max
+            flag[washout] |= WASHOUT
+
+        flags[curve] = flag
+
+    return pd.DataFrame(flags, index=df.index)
+
+def qc_mask(flags, curves=None, bits=ALL_BITS):
+    """
+    Boolean mask of the samples that pass the QC
+
+    Input:
+    flags: DataFrame with the bit flags from qc_flags
+    curves: list of curves that must pass. Defaults to
+        all the curves in flags
+    bits: bits of the rules to check, e.g., RANGE | SPIKE.
+        Defaults to all the rules
+
+    Output:
+    mask: boolean array, True where the samples pass.
+        Use df[mask] only where rows must be removed
+    """
+    if curves is None:
+        curves = flags.columns
+    failed = np.bitwise_or.reduce(flags[curves].to_numpy(), axis=1)
+
+    return (failed & bits) == 0
+
+def qc_apply(df, flags, bits=ALL_BITS, inplace=True):
+    """
+    Replaces the values that fail the QC by NaNs, in each
+    curve separately, so no rows are removed
+
+    Input:
+    df: DataFrame with the well logs
+    flags: DataFrame with the bit flags from qc_flags
+    bits: bits of the rules to apply, e.g., RANGE | SPIKE.
+        Defaults to all the rules
+    inplace: True to modify df without copying it
+
+    Output:
+    df: DataFrame with NaNs where the values fail the QC
+    """
+    if not inplace:
+        df = df.copy()
+    for curve in flags.columns:
+        failed = (flags[curve].to_numpy() & bits) != 0
+        if failed.any():
+            df[curve] = df[curve].mask(failed)
+
+    return df
+
+def qc_summary(flags, wells=None):
+    """
+    Fraction of the samples of each well that fail each
+    rule, for each curve
+
+    Input:
+    flags: DataFrame with the bit flags from qc_flags
+    wells: Series with the well names of the samples,
+        e.g., df["WELL"]. None summarizes all the samples
+
+    Output:
+    summary: DataFrame with the wells as the index and
+        (curve, rule) columns with the fraction of samples
+        that fail the rule
+    """
+    if wells is None:
+        wells = pd.Series("ALL", index=flags.index)
+    values = flags.to_numpy()
+    # one boolean frame per rule
+    failed = {}
+    for rule, bit in QC_BITS.items():
+        failed[rule] = pd.DataFrame((values & bit) != 0,
+                                    index=flags.index,
+                                    columns=flags.columns)
+    failed = pd.concat(failed, axis=1).swaplevel(axis=1)
+    summary = failed.groupby(wells.to_numpy()).mean()
+
+    return summary.sort_index(axis=1)
+
+def well_qc(df, rules, well_col="WELL", bits=ALL_BITS, inplace=True):
+    """
+    Cleans a DataFrame with well logs in a single step:
+    evaluates the QC rules, replaces the values that fail
+    by NaNs and summarizes the QC per well
+
+    Input:
+    df: DataFrame with the well logs
+    rules: dictionary with the QC rules (see qc_flags)
+    well_col: string with the name of the column with the
+        wells. Defaults to "WELL"
+    bits: bits of the rules to apply. Defaults to all
+    inplace: True to modify df without copying it
+
+    Output:
+    df: DataFrame with NaNs where the values fail the QC
+    flags: DataFrame with the bit flags
+    summary: DataFrame with the QC summary per well
+    """
+    flags = qc_flags(df, rules, well_col)
+    wells = df[well_col] if well_col in df.columns else None
+    summary = qc_summary(flags, wells)
+    df = qc_apply(df, flags, bits, inplace)
+
+    return df, flags, summary
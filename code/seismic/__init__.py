@@ -0,0 +1,3 @@
+# load the modules in the package
+from .attributes import *
+from .extraction import *
@@ -0,0 +1,213 @@
+# computation of seismic attributes on volumes that
+# are processed in blocks of inlines, in parallel
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import segyio
+from scipy.signal import hilbert
+from scipy.ndimage import uniform_filter
+
+# attributes that can be computed
+ATTRIBUTES = ["rms", "energy", "envelope", "phase"]
+
+def volume_shape(source):
+    """
+    Shape of a seismic volume
+
+    Input:
+        source: SEG-Y file name, .npy file name or 3D array
+            with the seismic data (inline, xline, time)
+    Output:
+        tuple with the number of inlines, xlines and
+        time samples
+    """
+    # numpy array or memory map
+    if not isinstance(source, str):
+        return source.shape
+    # numpy file, read only the header
+    if source.endswith(".npy"):
+        return np.load(source, mmap_mode="r").shape
+    # SEG-Y file
+    with segyio.open(source, "r") as f:
+        return (len(f.ilines), len(f.xlines), len(f.samples))
+
+def read_block(source, start, stop):
+    """
+    Read a block of inlines of a seismic volume
+
+    Input:
+        source: SEG-Y file name, .npy file name or 3D array
+            with the seismic data (inline, xline, time)
+        start, stop: first and last (excluded) inline indexes
+    Output:
+        3D float32 array with the inlines of the block
+    """
+    # numpy array or memory map
+    if not isinstance(source, str):
+        return np.asarray(source[start:stop], dtype=np.float32)
+    # numpy file, read only the block
+    if source.endswith(".npy"):
+        data = np.load(source, mmap_mode="r")
+        return np.asarray(data[start:stop], dtype=np.float32)
+    # SEG-Y file, read inline by inline
+    with segyio.open(source, "r") as f:
+        return np.stack([f.iline[il] for il in
+                         f.ilines[start:stop]]).astype(np.float32)
+
+def attribute_kernel(block, attribute, window, analytic=None):
+    """
+    Compute an attribute on a block of seismic data
+
+    Input:
+        block: 3D array with the seismic data (inline, xline,
+            time)
+        attribute: "rms" (RMS amplitude), "energy" (windowed
+            energy), "envelope" or "phase" (instantaneous
+            phase in degrees)
+        window: (inline, xline, time) window sizes for
+            "rms" and "energy"
+        analytic: analytic signal of the block, if already
+            computed for "envelope" or "phase"
+    Output:
+        3D float32 array with the attribute
+    """
+    if attribute in ["rms", "energy"]:
+        # mean of the squared amplitudes in the window
+        mean = uniform_filter(block**2, size=window, mode="reflect")
+        if attribute == "rms":
+            out = np.sqrt(np.maximum(mean, 0))
+        else:
+            out = mean * np.prod(window)
+    elif attribute in ["envelope", "phase"]:
+        # analytic signal along the time axis
+        if analytic is None:
+            analytic = hilbert(block, axis=-1)
+        if attribute == "envelope":
+            out = np.abs(analytic)
+        else:
+            out = np.angle(analytic, deg=True)
+    else:
+        raise ValueError(f"attribute must be one of {ATTRIBUTES}")
+
+    return out.astype(np.float32)
+
+def _process_block(source, r_start, r_stop, start, stop,
+                   attributes, window, out_files):
+    """
+    Compute the attributes on the inlines r_start to r_stop
+    (block plus halo) and write the inlines start to stop
+    (block without halo) to the output files. source is a
+    file name or the array of inlines r_start to r_stop
+    """
+    if isinstance(source, str):
+        block = read_block(source, r_start, r_stop)
+    else:
+        block = np.asarray(source, dtype=np.float32)
+
+    # the analytic signal is shared by envelope and phase
+    analytic = None
+    if "envelope" in attributes or "phase" in attributes:
+        analytic = hilbert(block, axis=-1)
+
+    for attribute, out_file in zip(attributes, out_files):
+        out = attribute_kernel(block, attribute, window, analytic)
+        # write the block without the halo
+        out_map = np.load(out_file, mmap_mode="r+")
+        out_map[start:stop] = out[start - r_start:stop - r_start]
+        out_map.flush()
+        del out_map
+
+    return start, stop
+
+def compute_attributes(source, attributes, out_dir, window=9,
+                       block_size=32, n_workers=None):
+    """
+    Compute seismic attributes on a volume processed in
+    blocks of inlines by a pool of processes. The results
+    are written to .npy files, so memory is bounded by the
+    block size and the number of workers
+
+    Input:
+        source: SEG-Y file name, .npy file name or 3D array
+            with the seismic data (inline, xline, time)
+        attributes: attribute name or list of names. Options
+            are "rms", "energy", "envelope" and "phase"
+        out_dir: directory where the attribute volumes are
+            written as <attribute>.npy
+        window: number of time samples of the window for
+            "rms" and "energy", or (inline, xline, time)
+            window sizes. Defaults to 9 time samples
+        block_size: number of inlines per block.
+            Defaults to 32
+        n_workers: number of processes. Defaults to the
+            number of CPUs. 1 runs in this process
+    Output:
+        dictionary with the attribute names as the keys
+        and read only memory maps of the volumes as the values
+    """
+    # check the attributes
+    if isinstance(attributes, str):
+        attributes = [attributes]
+    for attribute in attributes:
+        if attribute not in ATTRIBUTES:
+            raise ValueError(f"attribute must be one of {ATTRIBUTES}")
+
+    # window sizes along inline, xline and time
+    if np.isscalar(window):
+        window = (1, 1, int(window))
+    window = tuple(int(w) for w in window)
+    # inlines needed on each side of a block
+    halo = window[0] // 2
+
+    # create the output files
+    shape = volume_shape(source)
+    os.makedirs(out_dir, exist_ok=True)
+    out_files = [os.path.join(out_dir, f"{attribute}.npy")
+                 for attribute in attributes]
+    # the source must not be overwritten by an output file
+    if isinstance(source, str):
+        src_file = source
+    else:
+        src_file = getattr(source, "filename", None)
+    if src_file is not None:
+        for out_file in out_files:
+            if os.path.abspath(src_file) == os.path.abspath(out_file):
+                raise ValueError(f"source {src_file} would be "
+                                 "overwritten by the output")
+    for out_file in out_files:
+        out_map = np.lib.format.open_memmap(out_file, mode="w+",
+                                            dtype=np.float32,
+                                            shape=shape)
+        del out_map
+
+    # blocks of inlines, with the halo inlines to read
+    args = []
+    for start in range(0, shape[0], block_size):
+        stop = min(start + block_size, shape[0])
+        r_start = max(start - halo, 0)
+        r_stop = min(stop + halo, shape[0])
+        # files are read by the workers, arrays are sent
+        # to the workers block by block
+        block = source
+        if not isinstance(source, str):
+            block = source[r_start:r_stop]
+        args.append((block, r_start, r_stop, start, stop,
+                     attributes, window, out_files))
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+    if n_workers == 1:
+        # process the blocks one after the other
+        for arg in args:
+            _process_block(*arg)
+    else:
+        # process the blocks in parallel
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_process_block, *arg)
+                       for arg in args]
+            for future in futures:
+                future.result()
+
+    return {attribute: np.load(out_file, mmap_mode="r")
+            for attribute, out_file in zip(attributes, out_files)}
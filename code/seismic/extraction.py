@@ -0,0 +1,185 @@
+# extraction of seismic data along arbitrary lines
+# and well paths
+
+import numpy as np
+import segyio
+
+def survey_index(values, axis_values):
+    """
+    Convert survey values (inline or xline numbers, or
+    times) to fractional indexes of the volume
+
+    Input:
+        values: array with the survey values
+        axis_values: array with the survey values of the
+            axis, e.g., f.ilines, f.xlines or f.samples
+    Output:
+        array with the fractional indexes
+    """
+    axis_values = np.asarray(axis_values, dtype=float)
+    # step between values, as in the notebooks
+    step = ((np.amax(axis_values) - np.amin(axis_values))
+            / (axis_values.shape[0] - 1))
+
+    return (np.asarray(values, dtype=float) - axis_values[0]) / step
+
+def survey_transform(filename):
+    """
+    Affine transformation from X/Y coordinates to inline
+    and xline numbers, fitted to the trace headers of a
+    SEG-Y file
+
+    Input:
+        filename: SEG-Y file name
+    Output:
+        2 x 3 array A such that [il, xl] = A @ [x, y, 1]
+    """
+    with segyio.open(filename, "r") as f:
+        # read the headers of all traces at once
+        tf = segyio.TraceField
+        x = f.attributes(tf.CDP_X)[:].astype(float)
+        y = f.attributes(tf.CDP_Y)[:].astype(float)
+        il = f.attributes(tf.INLINE_3D)[:].astype(float)
+        xl = f.attributes(tf.CROSSLINE_3D)[:].astype(float)
+        scalar = f.attributes(tf.SourceGroupScalar)[:].astype(float)
+
+    # apply the coordinates scalar
+    scalar[scalar == 0] = 1
+    factor = np.where(scalar < 0, -1 / scalar, scalar)
+    x, y = x * factor, y * factor
+
+    # least squares fit of the transformation
+    g = np.column_stack([x, y, np.ones_like(x)])
+    coef, _, _, _ = np.linalg.lstsq(g, np.column_stack([il, xl]),
+                                    rcond=None)
+
+    return coef.T
+
+def xy_to_lines(x, y, transform):
+    """
+    Convert X/Y coordinates to inline and xline numbers
+
+    Input:
+        x, y: arrays with the coordinates
+        transform: 2 x 3 array from survey_transform
+    Output:
+        il, xl: arrays with the inline and xline numbers
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    il = transform[0, 0] * x + transform[0, 1] * y + transform[0, 2]
+    xl = transform[1, 0] * x + transform[1, 1] * y + transform[1, 2]
+
+    return il, xl
+
+def resample_path(il_id, xl_id, spacing=1.0):
+    """
+    Resample a polyline at a regular spacing
+
+    Input:
+        il_id, xl_id: arrays with the inline and xline
+            indexes of the polyline vertices
+        spacing: distance between samples in index units.
+            Defaults to 1 (one trace)
+    Output:
+        il_id, xl_id: arrays with the indexes of the samples
+    """
+    il_id = np.asarray(il_id, dtype=float)
+    xl_id = np.asarray(xl_id, dtype=float)
+    # distance along the polyline at the vertices
+    dist = np.concatenate([[0], np.cumsum(np.hypot(np.diff(il_id),
+                                                   np.diff(xl_id)))])
+    # distances of the samples
+    d_s = np.arange(0, dist[-1] + spacing / 2, spacing)
+
+    return np.interp(d_s, dist, il_id), np.interp(d_s, dist, xl_id)
+
+def _corners(index, n):
+    """
+    Lower index and weight for linear interpolation
+    between the nodes index and index + 1 of an axis
+    with n nodes. Indexes outside the axis or NaN are
+    flagged, and read from node 0
+    """
+    outside = ~np.isfinite(index) | (index < 0) | (index > n - 1)
+    index = np.where(np.isfinite(index), index, 0)
+    i0 = np.clip(np.floor(index), 0, max(n - 2, 0)).astype(int)
+    w = np.clip(index - i0, 0, 1)
+    i1 = np.minimum(i0 + 1, n - 1)
+
+    return i0, i1, w, outside
+
+def arbitrary_line(data, il_id, xl_id):
+    """
+    Extract the traces along a line with bilinear
+    interpolation between the four nearest traces
+
+    Input:
+        data: 3D array with the seismic data (inline, xline,
+            time), e.g., from segyio.tools.cube or a memory map
+        il_id, xl_id: arrays with the fractional inline and
+            xline indexes of the line, e.g., from survey_index
+            and resample_path
+    Output:
+        2D array (points x time) with the traces. Traces
+        outside the volume or at NaN indexes are NaN, e.g.,
+        il_id = [nan, 2] gives a NaN first trace. It can be
+        plotted with plot_slice as an "inline" slice
+    """
+    il_id = np.atleast_1d(np.asarray(il_id, dtype=float))
+    xl_id = np.atleast_1d(np.asarray(xl_id, dtype=float))
+    i0, i1, wi, out_i = _corners(il_id, data.shape[0])
+    j0, j1, wj, out_j = _corners(xl_id, data.shape[1])
+
+    # read the four corner traces of all points at once
+    ii = np.stack([i0, i1, i0, i1], axis=1)
+    jj = np.stack([j0, j0, j1, j1], axis=1)
+    traces = np.asarray(data[ii, jj, :], dtype=float)
+
+    # bilinear weights of the corners
+    w = np.stack([(1 - wi) * (1 - wj), wi * (1 - wj),
+                  (1 - wi) * wj, wi * wj], axis=1)
+    line = np.einsum("pc,pct->pt", w, traces)
+    line[out_i | out_j] = np.nan
+
+    return line
+
+def well_path_samples(data, il_id, xl_id, t_id):
+    """
+    Sample the volume along a well path with trilinear
+    interpolation
+
+    Input:
+        data: 3D array with the seismic data (inline, xline,
+            time), e.g., from segyio.tools.cube or a memory map
+        il_id, xl_id, t_id: arrays with the fractional inline,
+            xline and time indexes of the well path samples,
+            e.g., from survey_index
+    Output:
+        1D array with the seismic values along the well path,
+        NaN outside the volume or at NaN indexes, e.g.,
+        t_id = [nan, 3] (no time above the first checkshot)
+        gives a NaN first value. It can be plotted against the
+        well times next to the plot_logs tracks
+    """
+    il_id = np.atleast_1d(np.asarray(il_id, dtype=float))
+    xl_id = np.atleast_1d(np.asarray(xl_id, dtype=float))
+    t_id = np.atleast_1d(np.asarray(t_id, dtype=float))
+    i0, i1, wi, out_i = _corners(il_id, data.shape[0])
+    j0, j1, wj, out_j = _corners(xl_id, data.shape[1])
+    k0, k1, wk, out_k = _corners(t_id, data.shape[2])
+
+    # read the eight corner samples of all points at once
+    ii = np.stack([i0, i1, i0, i1, i0, i1, i0, i1], axis=1)
+    jj = np.stack([j0, j0, j1, j1, j0, j0, j1, j1], axis=1)
+    kk = np.stack([k0, k0, k0, k0, k1, k1, k1, k1], axis=1)
+    values = np.asarray(data[ii, jj, kk], dtype=float)
+
+    # trilinear weights of the corners
+    w_ij = np.stack([(1 - wi) * (1 - wj), wi * (1 - wj),
+                     (1 - wi) * wj, wi * wj], axis=1)
+    w = np.concatenate([w_ij * (1 - wk)[:, None],
+                        w_ij * wk[:, None]], axis=1)
+    samples = np.sum(w * values, axis=1)
+    samples[out_i | out_j | out_k] = np.nan
+
+    return samples